@@ -3,8 +3,10 @@
 Provides BaseRunner (common JSONL streaming loop), ParsedEvent, RunnerCallbacks,
 and get_runner() factory for multi-provider AI support.
 """
+import errno
 import json
 import os
+import select
 import subprocess
 import threading
 import time
@@ -58,6 +60,32 @@ class RunnerCallbacks:
 # Utility
 # ---------------------------------------------------------------------------
 
+def wait_proc_exit(proc, timeout):
+    """Block up to ``timeout`` seconds for proc to exit. True if it has exited.
+
+    On Linux (Python 3.9+) this sleeps on a pidfd so exit wakes the caller
+    immediately; Popen.wait(timeout) would spin-poll waitpid instead.
+    """
+    if hasattr(os, "pidfd_open"):
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except OSError as e:
+            if e.errno == errno.ESRCH:
+                return proc.poll() is not None  # already reaped
+            fd = None  # ENOSYS/EPERM (old kernel, WSL1, seccomp): use Popen.wait
+        if fd is not None:
+            try:
+                select.select([fd], [], [], timeout)
+            finally:
+                os.close(fd)
+            return proc.poll() is not None
+    try:
+        proc.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+
 def format_time(mins, secs):
     """Format elapsed time using i18n."""
     if mins > 0:
@@ -112,9 +140,11 @@ class BaseRunner:
         self._last_status_time = 0
 
         try:
+            # 64 KiB pipe buffer: stream-json lines carrying tool output are
+            # often far larger than the 8 KiB default, costing extra reads
             popen_kwargs = dict(
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                cwd=_cfg.WORK_DIR, env=env,
+                cwd=_cfg.WORK_DIR, env=env, bufsize=65536,
             )
             if IS_WINDOWS:
                 popen_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
@@ -180,10 +210,7 @@ class BaseRunner:
             # Flush remaining deferred edits
             self._flush_deferred_edits()
 
-            try:
-                proc.wait(timeout=10)
-            except Exception:
-                pass
+            wait_proc_exit(proc, 10)
             try:
                 stderr_out = proc.stderr.read().decode(
                     "utf-8", errors="replace").strip()
@@ -532,6 +559,7 @@ class BaseRunner:
                     fcntl.flock(f, fcntl.LOCK_EX)
                     f.write(line)
                     fcntl.flock(f, fcntl.LOCK_UN)
+            state.tokens_dirty.set()
         except Exception as e:
             log.warning("Failed to append token log: %s", e)
 
@@ -4,14 +4,15 @@ import pkgutil
 
 _handlers = {}   # {"/help": handler_func, ...}
 _callbacks = {}  # {"stg:": handler_func, ...}
+NATIVE_COMMAND_SET = set()  # {"help", ...} — decorator-registered names, no slash
 
 
 def command(name, aliases=None):
     """Decorator: register a command handler."""
     def decorator(func):
-        _handlers[name] = func
-        for a in (aliases or []):
-            _handlers[a] = func
+        for n in [name, *(aliases or [])]:
+            _handlers[n] = func
+            NATIVE_COMMAND_SET.add(n.lstrip("/").lower())
         return func
     return decorator
 
@@ -24,14 +25,17 @@ def callback(prefix):
     return decorator
 
 
-def dispatch(text):
-    """Match text to a command handler."""
-    cmd = text.split()[0].lower()
+def lookup(cmd):
+    """Match an already-split, lowercased command token (e.g. "/help")."""
     return _handlers.get(cmd)
 
 
 def dispatch_callback(data):
     """Match callback_data to a handler."""
+    # Prefixes are "name:" by convention — try the exact head first
+    handler = _callbacks.get(data[:data.find(":") + 1])
+    if handler:
+        return handler
     for prefix, handler in _callbacks.items():
         if data.startswith(prefix):
             return handler
@@ -37,7 +37,7 @@ def handle_model(text):
     enabled = _enabled_providers()
     args = text.split()[1:]  # everything after /model
     if not args:
-        provider_label = AI_MODELS.get(state.provider, {}).get("label", state.provider)
+        provider_label = state.provider_label
         if state.model:
             current_display = f"{provider_label} - <code>{escape_html(state.model)}</code>"
         else:
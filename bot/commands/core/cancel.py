@@ -16,7 +16,7 @@ def handle_cancel(text):
             proc.terminate()
         else:
             proc.kill()
-        # Don't touch busy/queue — let _run's finally block handle naturally
+        # Don't touch busy/queue — _drain_messages moves on to the next message
         send_html(f"<b>{t('cancel.done')}</b> {t('cancel.killed')}")
     elif was_busy:
         # No proc but busy — safety reset (thread may have crashed)
@@ -1,7 +1,6 @@
 """Help command: /help, /start."""
 from commands import command
 from i18n import t
-from config import AI_MODELS
 from state import state
 from telegram import escape_html, send_html
 
@@ -9,7 +8,7 @@ from telegram import escape_html, send_html
 @command("/help", aliases=["/start"])
 def handle_help(text):
     session_info = f"<code>{state.session_id[:8]}</code>" if state.session_id else t("status.no_session").split("(")[0].strip()
-    _prov_label = AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
+    _prov_label = state.provider_label
     _model_name = escape_html(state.model) if state.model else t('model.cli_default')
     model_info = f"{_prov_label} - {_model_name}"
     msg = (
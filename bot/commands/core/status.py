@@ -3,7 +3,7 @@ import platform
 
 from commands import command
 from i18n import t
-from config import IS_WINDOWS, AI_MODELS
+from config import IS_WINDOWS
 from state import state
 from telegram import escape_html, send_html
 
@@ -11,7 +11,7 @@ from telegram import escape_html, send_html
 @command("/status")
 def handle_status(text):
     session_info = f"<code>{state.session_id[:8]}</code>" if state.session_id else t("status.no_session")
-    _prov_label2 = AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
+    _prov_label2 = state.provider_label
     _model_name2 = escape_html(state.model) if state.model else t('model.cli_default')
     model_info = f"{_prov_label2} - <code>{_model_name2}</code>"
     busy_info = t("status.processing") if state.busy else t("status.idle")
@@ -4,7 +4,7 @@ import os
 
 from commands import command
 from i18n import t
-from config import update_config, AI_MODELS, log
+from config import update_config, log
 from state import state, switch_provider
 from telegram import escape_html, send_html
 from sessions import get_provider_sessions, get_session_model, get_session_provider, find_project_dirs
@@ -25,7 +25,7 @@ def handle_session(text):
     for i, (sid, ts, preview) in enumerate(sessions, 1):
         p = preview[:50] + "..." if len(preview) > 50 else preview
         lines.append(f"<b>{i}.</b> <code>{sid[:8]}</code> {escape_html(ts)}\n    {escape_html(p)}")
-    provider_label = AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
+    provider_label = state.provider_label
     current = ""
     if state.session_id: current = f"\n{t('session.current')}: <code>{state.session_id[:8]}</code>"
     msg = (f"<b>{t('session.title')}</b> ({provider_label}){current}\n{'━'*25}\n"
@@ -110,7 +110,7 @@ def handle_selection(text):
             state.selecting = False
             _connect_session(sid)
             p = preview[:60] + "..." if len(preview) > 60 else preview
-            provider_label = AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
+            provider_label = state.provider_label
             model_line = f"\n{t('status.model_label')}: {provider_label} - <code>{escape_html(state.model or 'default')}</code>"
             send_html(
                 f"<b>{t('session.connected')}</b>\nID: <code>{sid[:8]}</code>\n"
@@ -132,7 +132,7 @@ def handle_selection(text):
         if found:
             state.selecting = False
             _connect_session(text)
-            provider_label = AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
+            provider_label = state.provider_label
             model_info = f" | {provider_label} - {escape_html(state.model)}" if state.model else ""
             send_html(f"<b>{t('session.connected')}</b> <code>{text[:8]}</code>{model_info}")
         else:
@@ -7,6 +7,7 @@ import sys
 import time
 import uuid
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 from commands import command
 from i18n import t
@@ -60,10 +61,11 @@ def _update_profile_photo():
 
 def _git_blob_sha1(filepath):
     """Compute git blob SHA1 for a local file (same algorithm as git)."""
+    h = hashlib.sha1(f"blob {os.path.getsize(filepath)}\0".encode())
     with open(filepath, "rb") as f:
-        data = f.read()
-    header = f"blob {len(data)}\0".encode()
-    return hashlib.sha1(header + data).hexdigest()
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 
 def _fetch_bot_file_list():
@@ -92,8 +94,7 @@ def _download_via_api(rel_path):
 def _update_all_files(bot_dir):
     """Download changed bot files via GitHub API, return (updated, added) lists."""
     files = _fetch_bot_file_list()
-    updated = []
-    added = []
+    to_fetch = []  # [(rel_path, local_path, is_existing), ...]
     for rel_path, remote_sha in files:
         local_path = os.path.join(bot_dir, rel_path)
         is_existing = os.path.exists(local_path)
@@ -104,17 +105,30 @@ def _update_all_files(bot_dir):
                     continue
             except Exception:
                 pass
+        to_fetch.append((rel_path, local_path, is_existing))
+
+    def _fetch_one(item):
+        rel_path, local_path, _ = item
         try:
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
             content = _download_via_api(rel_path)
             with open(local_path, "wb") as f:
                 f.write(content)
-            if is_existing:
-                updated.append(rel_path)
-            else:
-                added.append(rel_path)
+            return True
         except Exception as e:
             log.warning("Failed to update %s: %s", rel_path, e)
+            return False
+
+    updated = []
+    added = []
+    if not to_fetch:
+        return updated, added
+    # Downloads are independent round-trips; run them concurrently
+    with ThreadPoolExecutor(max_workers=min(8, len(to_fetch))) as ex:
+        results = list(ex.map(_fetch_one, to_fetch))
+    for (rel_path, _, is_existing), ok in zip(to_fetch, results):
+        if ok:
+            (updated if is_existing else added).append(rel_path)
     return updated, added
 
 
@@ -14,7 +14,7 @@ from tokens import publish_token_data, compute_all_period_tokens, fetch_remote_t
 
 
 def _save_remote_bots():
-    config.update_config("remote_bots", config.REMOTE_BOTS)
+    config.update_config("remote_bots", list(config.REMOTE_BOTS))
 
 
 @command("/total_tokens", aliases=["/totaltokens"])
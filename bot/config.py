@@ -4,13 +4,15 @@ import logging
 import os
 import platform
 import shutil
+import threading
 
 IS_WINDOWS = platform.system() == "Windows"
 
 # ---------------------------------------------------------------------------
 # Directory structure (DDD)
 # ---------------------------------------------------------------------------
-ROOT_DIR = os.path.expanduser("~/.sumone")
+# Both absolute and normalized once here; callers compare them as strings
+ROOT_DIR = os.path.abspath(os.path.expanduser("~/.sumone"))
 BOT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 CONFIG_DIR = os.path.join(ROOT_DIR, "config")
@@ -52,6 +54,8 @@ def load_config():
 _config = load_config()
 BOT_TOKEN = _config.get("bot_token", "")
 CHAT_ID = str(_config.get("chat_id", ""))
+# Telegram delivers chat.id as int; compare against this on the update hot path
+CHAT_ID_INT = int(CHAT_ID) if CHAT_ID.lstrip("-").isdigit() else None
 WORK_DIR = _config.get("work_dir", os.path.expanduser("~"))
 LANG = _config.get("lang", "ko")
 GITHUB_REPO = _config.get("github_repo", "xmin-02/sumone")
@@ -117,7 +121,8 @@ settings = {**DEFAULT_SETTINGS, **_config.get("settings", {})}
 
 MAX_MSG_LEN = 3900
 MAX_PARTS = 20
-POLL_TIMEOUT = 30
+MAX_QUEUED = 20   # messages waiting behind the running AI call; more are refused
+POLL_TIMEOUT = 50   # getUpdates long-poll seconds (Telegram allows up to 50)
 
 MODEL_ALIASES = {
     # Claude
@@ -166,13 +171,23 @@ logging.basicConfig(
 log = logging.getLogger("tg-bot")
 
 
+_config_lock = threading.Lock()  # update_config runs from several worker threads
+
+
 def update_config(key, value):
     """Unified config.json updater."""
     try:
-        with open(CONFIG_FILE, encoding="utf-8") as f:
-            cfg = json.load(f)
-        cfg[key] = value
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=4, ensure_ascii=False)
+        # Serialize the read-modify-write so concurrent updates of different
+        # keys cannot overwrite each other
+        with _config_lock:
+            with open(CONFIG_FILE, encoding="utf-8") as f:
+                cfg = json.load(f)
+            cfg[key] = value
+            # Write beside the target and swap it in, so a crash mid-write
+            # never leaves a truncated config.json (which holds the bot token)
+            tmp = CONFIG_FILE + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(cfg, indent=4, ensure_ascii=False))
+            os.replace(tmp, CONFIG_FILE)
     except Exception as e:
         log.warning("Failed to update config key=%s: %s", key, e)
@@ -1,4 +1,5 @@
 """File download and prompt building."""
+import collections
 import os
 import time
 import urllib.request
@@ -7,6 +8,10 @@ from config import BOT_TOKEN, DATA_DIR, log
 from telegram import tg_api
 
 DOWNLOAD_DIR = os.path.join(DATA_DIR, "downloads")
+# {(file_id, filename): (local_path, size, mtime_ns)}, least recently used first.
+# A hit is reused only while the file on disk is unchanged since the download.
+_download_cache = collections.OrderedDict()
+_DOWNLOAD_CACHE_MAX = 256
 
 IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
 TEXT_EXTS = {
@@ -17,6 +22,19 @@ TEXT_EXTS = {
 
 
 def download_tg_file(file_id, filename=None):
+    key = (file_id, filename)
+    cached = _download_cache.get(key)
+    if cached:
+        path, size, mtime_ns = cached
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st and st.st_size == size and st.st_mtime_ns == mtime_ns:
+            _download_cache.move_to_end(key)
+            log.info("Download cache hit: %s", path)
+            return path
+        del _download_cache[key]  # removed or edited in place since the download
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
     result = tg_api("getFile", {"file_id": file_id})
     if not result or not result.get("ok"): return None
@@ -28,6 +46,10 @@ def download_tg_file(file_id, filename=None):
     try:
         urllib.request.urlretrieve(url, local_path)
         log.info("Downloaded: %s -> %s", tg_path, local_path)
+        st = os.stat(local_path)
+        _download_cache[key] = (local_path, st.st_size, st.st_mtime_ns)
+        if len(_download_cache) > _DOWNLOAD_CACHE_MAX:
+            _download_cache.popitem(last=False)
         return local_path
     except Exception as e:
         log.error("Download failed: %s", e); return None
@@ -61,7 +61,7 @@ def generate_token():
 def get_or_create_fixed_token():
     """Return a persistent fixed token stored in config.json. Creates one if absent."""
     import json as _json
-    from config import CONFIG_FILE
+    from config import CONFIG_FILE, update_config
     try:
         with open(CONFIG_FILE, encoding="utf-8") as f:
             cfg = _json.load(f)
@@ -70,12 +70,7 @@ def get_or_create_fixed_token():
     token = cfg.get("viewer_fixed_token")
     if not token:
         token = secrets.token_urlsafe(32)
-        cfg["viewer_fixed_token"] = token
-        try:
-            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                _json.dump(cfg, f, indent=4, ensure_ascii=False)
-        except Exception:
-            pass
+        update_config("viewer_fixed_token", token)
     # Ensure token is registered (no expiry)
     with _token_lock:
         _tokens[token] = 0
@@ -3,6 +3,7 @@ import json
 import os
 
 _strings = {}
+_cache = {}  # {key: resolved value or None} — cleared on load()
 
 def load(lang):
     """Load language pack."""
@@ -10,17 +11,27 @@ def load(lang):
     path = os.path.join(os.path.dirname(__file__), f"{lang}.json")
     with open(path, encoding="utf-8") as f:
         _strings = json.load(f)
+    _cache.clear()
 
-def t(key, **kwargs):
-    """Get translated string by dot-separated key. t("error.timeout") -> "시간 초과..." """
+def _lookup(key):
+    """Walk a dot-separated key through the loaded pack. None if missing."""
     val = _strings
     for part in key.split("."):
-        if isinstance(val, dict):
-            val = val.get(part)
-            if val is None:
-                return key
-        else:
-            return key
+        if not isinstance(val, dict):
+            return None
+        val = val.get(part)
+        if val is None:
+            return None
+    return val if isinstance(val, (str, list, dict)) else None
+
+def t(key, **kwargs):
+    """Get translated string by dot-separated key. t("error.timeout") -> "시간 초과..." """
+    try:
+        val = _cache[key]
+    except KeyError:
+        val = _cache[key] = _lookup(key)
+    if val is None:
+        return key
     if isinstance(val, str) and kwargs:
         return val.format(**kwargs)
-    return val if isinstance(val, (str, list, dict)) else key
+    return val
@@ -3,23 +3,35 @@
 
 Polling loop, update routing, and message handling.
 """
+import hashlib
 import json
 import os
+import queue
+import random
+import re
 import signal
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Unix lock file support (prevents duplicate instances under launchd)
 if sys.platform != "win32":
     import fcntl
 
+# Run as a script, this module is "__main__"; command modules that lazily do
+# "from main import handle_message" must get this instance (and its worker
+# queues), not a second, worker-less copy of the module.
+if __name__ == "__main__":
+    sys.modules.setdefault("main", sys.modules[__name__])
+
 import i18n
 import config
-from config import BOT_TOKEN, CHAT_ID, POLL_TIMEOUT, IS_WINDOWS, settings, log
+from config import BOT_TOKEN, CHAT_ID, CHAT_ID_INT, POLL_TIMEOUT, IS_WINDOWS, settings, log
 from state import state
 from telegram import (
-    escape_html, tg_api, send_html, delete_msg, send_long, send_typing,
+    escape_html, tg_api, send_html, send_html_paced, delete_msg, send_long, send_typing,
+    md_to_telegram_html, split_message,
 )
 from tokens import token_footer, get_monthly_tokens, publish_token_data, PUBLISH_INTERVAL
 from downloader import download_tg_file, build_file_prompt
@@ -28,12 +40,22 @@ from sessions import get_session_model
 import cli_watcher
 
 # commands/__init__.py auto-imports all subpackage modules via _auto_import()
-from commands import dispatch, dispatch_callback
+from commands import dispatch_callback, lookup
 from commands.session.session import (
     show_questions, handle_answer, handle_selection, _save_session_id,
 )
 from commands.usage.total_tokens import handle_token_input
 
+try:
+    from ai.connect import (
+        is_connect_active, handle_connect_response, handle_connect_callback,
+    )
+except ImportError:
+    # connect module unavailable (e.g. pty not available on Windows)
+    is_connect_active = handle_connect_response = handle_connect_callback = None
+
+_HOME = os.path.expanduser("~")
+
 
 # ---------------------------------------------------------------------------
 # Core message handler
@@ -42,24 +64,33 @@ from commands.usage.total_tokens import handle_token_input
 def handle_message(text):
     """Send user text to Claude CLI and deliver the response."""
     # Route to connect flow if active
-    try:
-        from ai.connect import is_connect_active, handle_connect_response
-        if is_connect_active():
-            if not handle_connect_response(text):
-                send_html(f"<i>{i18n.t('ai_connect.busy')}</i>")
-            return
-    except ImportError:
-        pass  # connect module unavailable (e.g. pty not available on Windows)
+    if is_connect_active and is_connect_active():
+        if not handle_connect_response(text):
+            send_html(f"<i>{i18n.t('ai_connect.busy')}</i>")
+        return
 
+    # busy and message_queue must change together (see _drain_messages, which
+    # pops the next message or clears busy under the lock), so the lock stays —
+    # but only around the flag/queue, never a network call
     with state.lock:
-        if state.busy:
+        queued = state.busy
+        refused = False
+        if not queued:
+            state.busy = True
+        elif len(state.message_queue) < config.MAX_QUEUED:
             state.message_queue.append(text)
-            qlen = len(state.message_queue)
-            send_html(f"<i>{i18n.t('queued', pos=qlen)}</i>")
-            log.info("Message queued (pos %d): %s", qlen, text[:80])
-            return
-        state.busy = True
+        else:
+            refused = True  # bounded backlog: one AI run at a time per session
+        qlen = len(state.message_queue)
 
+    if refused:
+        send_html(f"<i>{i18n.t('busy')}</i>")
+        log.warning("Message refused, queue full (%d): %s", qlen, text[:80])
+        return
+    if queued:
+        send_html(f"<i>{i18n.t('queued', pos=qlen)}</i>")
+        log.info("Message queued (pos %d): %s", qlen, text[:80])
+        return
     _run_message(text)
 
 
@@ -80,7 +111,7 @@ def _send_file_viewer_link(had_new_files):
         else:
             token = generate_token()
         url = f"{state.file_viewer_url}?token={token}"
-        count = len(set(e["path"] for e in state.modified_files))
+        count = len(state._modified_paths)
         label = i18n.t("file_viewer.link", count=count)
         result = tg_api("sendMessage", {
             "chat_id": CHAT_ID,
@@ -100,15 +131,34 @@ def _send_file_viewer_link(had_new_files):
         log.warning("Failed to send file viewer link: %s", e)
 
 
+# Everything the runner emits mid-run (intermediate text, status, cost, file
+# viewer link) goes through this one queue as (fn, args), so _stream_worker
+# sends it in stream order and the runner never blocks on Telegram.
+_stream_q = queue.Queue()
+
+
+def _queued(fn):
+    """Wrap a runner callback so it runs on _stream_worker, in arrival order."""
+    return lambda *args: _stream_q.put((fn, args))
+
+
+def _stream_worker():
+    """Run queued runner callbacks one at a time."""
+    while True:
+        fn, args = _stream_q.get()
+        try:
+            fn(*args)
+        except Exception as e:
+            log.warning("Failed to send streamed update: %s", e)
+        finally:
+            _stream_q.task_done()
+
+
 def _on_intermediate_text(text):
     """Callback: send intermediate AI text to Telegram."""
-    from telegram import md_to_telegram_html, split_message
     html = md_to_telegram_html(text)
-    chunks = split_message(html)
-    for idx, chunk in enumerate(chunks):
-        send_html(f"\U0001f4ad {chunk}")
-        if idx < len(chunks) - 1:
-            time.sleep(0.3)
+    for chunk in split_message(html):
+        send_html_paced(f"\U0001f4ad {chunk}")
 
 
 def _on_status(label, elapsed_secs):
@@ -131,154 +181,254 @@ def _on_cost(parsed):
     send_html(f"<i>{cost_line}</i>")
 
 
+# ---------------------------------------------------------------------------
+# Typing indicators (one shared worker for every in-flight run)
+# ---------------------------------------------------------------------------
+
+_TYPING_ANIM_INTERVAL = 3     # seconds between animation frame edits
+_TYPING_ACTION_INTERVAL = 4   # Telegram shows "typing" for ~5s; refresh before it lapses
+_typing_lock = threading.Lock()
+_typing_entries = []              # [{"msg_id", "frames", "idx", "next_edit", "next_action"}, ...]
+_typing_wake = threading.Event()  # set while _typing_entries is non-empty
+
+
+def _typing_start(msg_id=None, frames=None):
+    """Register a run for typing indicators. Returns a handle for _typing_stop().
+
+    The chat action is refreshed for every entry; the placeholder message
+    is only animated when both msg_id and frames are given.
+    """
+    now = time.monotonic()
+    entry = {"msg_id": msg_id, "frames": frames if msg_id else None, "idx": 0,
+             "next_edit": now + _TYPING_ANIM_INTERVAL,
+             "next_action": now + _TYPING_ACTION_INTERVAL}
+    with _typing_lock:
+        _typing_entries.append(entry)
+        _typing_wake.set()
+    return entry
+
+
+def _typing_stop(entry):
+    """Unregister a run; no new edit starts for it after this returns. Idempotent."""
+    if entry is None:
+        return
+    with _typing_lock:
+        _typing_entries[:] = [e for e in _typing_entries if e is not entry]
+
+
+def _typing_worker():
+    """Service all registered typing indicators; idle while there are none."""
+    while True:
+        _typing_wake.wait()
+        time.sleep(1)
+        # Decide what is due under the lock, but make the Telegram calls
+        # outside it: tg_api can sleep on 429s, and _typing_stop() must not wait
+        with _typing_lock:
+            if not _typing_entries:
+                _typing_wake.clear()
+                continue
+            now = time.monotonic()
+            edits = []  # [(entry, text), ...]
+            action_due = False
+            for entry in _typing_entries:
+                frames = entry["frames"]
+                if frames and now >= entry["next_edit"]:
+                    prev = frames[entry["idx"]]
+                    entry["idx"] = (entry["idx"] + 1) % len(frames)
+                    if frames[entry["idx"]] != prev:
+                        edits.append((entry, frames[entry["idx"]]))
+                    entry["next_edit"] = now + _TYPING_ANIM_INTERVAL
+                if now >= entry["next_action"]:
+                    action_due = True
+            # Every run shares the one chat, so a single action covers them all
+            if action_due:
+                for entry in _typing_entries:
+                    entry["next_action"] = now + _TYPING_ACTION_INTERVAL
+        for entry, text in edits:
+            with _typing_lock:
+                if not any(e is entry for e in _typing_entries):
+                    continue  # stopped meanwhile; its placeholder is being deleted
+            ok = tg_api("editMessageText", {
+                "chat_id": CHAT_ID, "message_id": entry["msg_id"],
+                "text": text, "parse_mode": "HTML",
+            })
+            if ok is None:
+                entry["frames"] = None  # placeholder gone or rate-limited; stop animating
+            # Measure from when the edit returned so a slow round-trip
+            # stretches the cadence instead of queueing edits back to back
+            entry["next_edit"] = time.monotonic() + _TYPING_ANIM_INTERVAL
+        if action_due:
+            send_typing()
+
+
+_run_q = queue.Queue()  # first message of a busy period, handed to _run_worker
+
+
 def _run_message(text):
-    """Internal: execute a single message with typing animation."""
-    # Animated typing indicator
-    typing_id = [None]
-    typing_stop = threading.Event()
-    if settings.get("show_typing", True):
-        r = send_html(f"<b>{i18n.t('typing.label')} \u00b7</b>\n<i>{i18n.t('typing.cancel_hint')}</i>")
-        try:
-            typing_id[0] = r
-        except Exception:
-            pass
+    """Internal: hand text to the AI worker, which then drains the message queue."""
+    _run_q.put(text)
+
+
+def _run_worker():
+    """Long-lived AI worker: run messages back to back, one at a time.
+
+    Each busy period starts with a _run_q item (handle_message has just set
+    state.busy) and ends when state.message_queue is observed empty under
+    state.lock, at which point busy is released.
+    """
+    while True:
+        _drain_messages(_run_q.get())
 
-        def _typing_anim():
-            dots = ["\u00b7", "\u00b7\u00b7", "\u00b7\u00b7\u00b7"]
-            idx = 0
-            while not typing_stop.is_set():
-                typing_stop.wait(3)
-                if typing_stop.is_set():
-                    break
-                idx = (idx + 1) % len(dots)
-                if typing_id[0]:
-                    tg_api("editMessageText", {
-                        "chat_id": CHAT_ID, "message_id": typing_id[0],
-                        "text": f"<b>{i18n.t('typing.label')} {dots[idx]}</b>\n<i>{i18n.t('typing.cancel_hint')}</i>",
-                        "parse_mode": "HTML",
-                    })
-
-        threading.Thread(target=_typing_anim, daemon=True).start()
-        send_typing()
-    sid = state.session_id
 
-    def _run():
+def _drain_messages(text):
+    """Run text, then every queued message, then release state.busy."""
+    while text:
         try:
-            callbacks = RunnerCallbacks(
-                on_text=_on_intermediate_text,
-                on_status=_on_status,
-                on_typing=send_typing,
-                on_cost=_on_cost,
-                on_file_link=_send_file_viewer_link,
-            )
-            runner = get_runner(callbacks=callbacks)
-            provider_label = config.AI_MODELS.get(
-                state.provider, {}).get("label", state.provider.title())
-
-            log.info("%s starting for: %s", provider_label, text[:80])
-            output, new_sid, questions = runner.run(text, session_id=sid)
-            log.info("%s finished, output=%d chars, new_sid=%s, questions=%s",
-                     provider_label,
-                     len(output) if output else 0, new_sid, bool(questions))
-
-            if new_sid and not sid:
-                # Brand new session (no previous session_id)
-                state.session_id = new_sid
-                state._provider_sessions[state.provider] = new_sid
-                _save_session_id(new_sid)
-                config.update_config("provider_sessions", dict(state._provider_sessions))
-                log.info("Session created: %s (%s)", new_sid, state.provider)
-
-            active_sid = state.session_id or new_sid or sid
-            footer = token_footer()
-
-            typing_stop.set()
-            delete_msg(typing_id[0])
-
-            if questions:
-                show_questions(questions, active_sid)
-                if output and output not in ("",):
-                    header = provider_label
-                    if active_sid:
-                        header += f" [{active_sid[:8]}]"
-                    send_long(header, output, footer=footer)
-                return
-
-            if not output:
-                send_html(f"<i>{i18n.t('error.empty_response')}</i>")
-                return
-
-            header = provider_label
-            if active_sid:
-                header += f" [{active_sid[:8]}]"
-            send_long(header, output, footer=footer)
-            log.info("Response sent to Telegram")
+            _run_one(text)
         except Exception as e:
-            log.error("handle_message error: %s", e, exc_info=True)
-            typing_stop.set()
-            delete_msg(typing_id[0])
-            send_html(f"<i>{i18n.t('error.generic', msg=str(e))}</i>")
-        finally:
-            # Process next queued message, or release busy
-            next_text = None
-            with state.lock:
-                if state.message_queue:
-                    next_text = state.message_queue.popleft()
-                else:
-                    state.busy = False
-            if next_text:
-                log.info("Processing queued message: %s", next_text[:80])
-                _run_message(next_text)
+            log.error("Run worker error: %s", e, exc_info=True)
+        # Process next queued message, or release busy
+        with state.lock:
+            if state.message_queue:
+                text = state.message_queue.popleft()
+            else:
+                text = None
+                state.busy = False
+        if text:
+            log.info("Processing queued message: %s", text[:80])
 
-    threading.Thread(target=_run, daemon=True).start()
+
+def _run_one(text):
+    """Run a single message through the AI runner with typing animation."""
+    # Animated typing indicator
+    typing_id = None
+    frames = None
+    if settings.get("show_typing", True):
+        # All animation frames are built once; the worker only indexes them
+        label, hint = i18n.t("typing.label"), i18n.t("typing.cancel_hint")
+        frames = [f"<b>{label} {d}</b>\n<i>{hint}</i>"
+                  for d in ("\u00b7", "\u00b7\u00b7", "\u00b7\u00b7\u00b7")]
+        typing_id = send_html(frames[0])
+    send_typing()
+    indicator = _typing_start(typing_id, frames)
+    sid = state.session_id
+
+    try:
+        callbacks = RunnerCallbacks(
+            on_text=_queued(_on_intermediate_text),
+            on_status=_queued(_on_status),
+            on_typing=None,   # chat action is refreshed by _typing_worker
+            on_cost=_queued(_on_cost),
+            on_file_link=_queued(_send_file_viewer_link),
+        )
+        runner = get_runner(callbacks=callbacks)
+        provider_label = state.provider_label
+
+        log.info("%s starting for: %s", provider_label, text[:80])
+        output, new_sid, questions = runner.run(text, session_id=sid)
+        log.info("%s finished, output=%d chars, new_sid=%s, questions=%s",
+                 provider_label,
+                 len(output) if output else 0, new_sid, bool(questions))
+
+        if new_sid and not sid:
+            # Brand new session (no previous session_id)
+            state.session_id = new_sid
+            state._provider_sessions[state.provider] = new_sid
+            _save_session_id(new_sid)
+            config.update_config("provider_sessions", dict(state._provider_sessions))
+            log.info("Session created: %s (%s)", new_sid, state.provider)
+
+        active_sid = state.session_id or new_sid or sid
+        header = f"{provider_label} [{active_sid[:8]}]" if active_sid else provider_label
+        footer = token_footer()
+
+        # Final answer goes out only after everything the run streamed
+        _stream_q.join()
+        _typing_stop(indicator)
+        delete_msg(typing_id)
+
+        if questions:
+            show_questions(questions, active_sid)
+            if output:
+                send_long(header, output, footer=footer)
+            return
+
+        if not output:
+            send_html(f"<i>{i18n.t('error.empty_response')}</i>")
+            return
+
+        send_long(header, output, footer=footer)
+        log.info("Response sent to Telegram")
+    except Exception as e:
+        log.error("handle_message error: %s", e, exc_info=True)
+        _stream_q.join()
+        _typing_stop(indicator)
+        delete_msg(typing_id)
+        send_html(f"<i>{i18n.t('error.generic', msg=str(e))}</i>")
+    finally:
+        _typing_stop(indicator)
 
 
 # ---------------------------------------------------------------------------
 # Update router
 # ---------------------------------------------------------------------------
 
+_CMD_HEAD_RE = re.compile(r"/[^\s@]*")  # "/cmd" from "/cmd@bot args"
+
+
 def process_update(update):
-    # --- Callback queries (inline keyboards) ---
+    # allowed_updates limits delivery to these two kinds; anything else is a no-op
     cb = update.get("callback_query")
     if cb:
-        cb_chat = str(cb.get("message", {}).get("chat", {}).get("id", ""))
-        if cb_chat != CHAT_ID:
+        _process_callback(cb)
+        return
+    msg = update.get("message")
+    if msg:
+        _process_message(msg)
+
+
+def _process_callback(cb):
+    """Route an inline keyboard callback query."""
+    try:
+        cb_msg = cb["message"]
+        if cb_msg["chat"]["id"] != CHAT_ID_INT:
             return
-        data = cb.get("data", "")
-        # Route connect: callbacks to connect flow
-        if data.startswith("connect:"):
-            try:
-                from ai.connect import handle_connect_callback
-            except ImportError:
-                return
-            from telegram import tg_api as _tga
-            cb_id = cb["id"]
-            payload = data[len("connect:"):]
-            if handle_connect_callback(payload):
-                _tga("answerCallbackQuery", {"callback_query_id": cb_id})
+    except (KeyError, TypeError):
+        return  # no originating message (e.g. inline mode) or a null field
+    data = cb.get("data", "")
+    # Route connect: callbacks to connect flow
+    if data.startswith("connect:"):
+        if handle_connect_callback is None:
             return
-        handler = dispatch_callback(data)
-        if handler:
-            msg_id = cb.get("message", {}).get("message_id")
-            handler(cb["id"], msg_id, data)
+        cb_id = cb["id"]
+        payload = data[len("connect:"):]
+        if handle_connect_callback(payload):
+            tg_api("answerCallbackQuery", {"callback_query_id": cb_id})
         return
+    handler = dispatch_callback(data)
+    if handler:
+        handler(cb["id"], cb_msg.get("message_id"), data)
 
-    # --- Messages ---
-    msg = update.get("message")
-    if not msg:
-        return
-    chat_id = str(msg.get("chat", {}).get("id", ""))
-    if chat_id != CHAT_ID:
+
+def _process_message(msg):
+    """Route an incoming message: attachments, state handlers, commands, then AI."""
+    try:
+        chat_id = msg["chat"]["id"]
+    except (KeyError, TypeError):
+        chat_id = None
+    if chat_id != CHAT_ID_INT:
         log.warning("Unauthorized: %s", chat_id)
         return
 
-    text = msg.get("text", "").strip()
-    caption = msg.get("caption", "").strip()
+    # One read per field up front; "or" also tolerates explicit nulls
+    text = (msg.get("text") or "").strip()
+    photos = msg.get("photo")
+    doc = msg.get("document")
+    caption = (msg.get("caption") or "").strip() if (photos or doc) else ""
 
     # Photo attachment
-    photos = msg.get("photo")
     if photos:
-        best = max(photos, key=lambda p: p.get("file_size", 0))
+        best = photos[-1]  # Telegram lists sizes ascending; last is the largest
         local = download_tg_file(best["file_id"])
         if local:
             prompt = build_file_prompt(local, caption or i18n.t("file_prompt.photo_caption"))
@@ -289,7 +439,6 @@ def process_update(update):
         return
 
     # Document attachment
-    doc = msg.get("document")
     if doc:
         fname = doc.get("file_name", "file")
         local = download_tg_file(doc["file_id"], fname)
@@ -305,10 +454,15 @@ def process_update(update):
         return
 
     log.info("Received: %s", text[:100])
-    lower = text.lower()
+    # Only the first token of a slash command is ever inspected; plain text
+    # (often a long AI prompt) is never lowercased or split, and the regex
+    # match copies just the head (minus any @botname suffix), not the tail.
+    is_cmd = text[0] == "/"
+    head_end = _CMD_HEAD_RE.match(text).end() if is_cmd else 0
+    cmd_head = text[:head_end].lower()
 
     # Special state-based handlers (before command dispatch)
-    if lower == "/cancel_connect":
+    if cmd_head == "/cancel_connect":
         state.waiting_token_input = False
         send_html(i18n.t("cancel.connect_cancelled"))
         return
@@ -325,17 +479,19 @@ def process_update(update):
         handle_selection(text)
         return
 
-    # Command dispatch via registry
-    handler = dispatch(text)
-    if handler:
-        handler(text)
-        return
+    if is_cmd:
+        # Command dispatch via registry (head is already split and lowercased)
+        handler = lookup(cmd_head)
+        if handler:
+            handler(text)
+            return
 
-    # Underscore → hyphen normalization for slash commands (e.g. /code_review → /code-review)
-    if text.startswith("/") and "_" in text.split()[0]:
-        parts = text.split(maxsplit=1)
-        parts[0] = parts[0].replace("_", "-")
-        text = " ".join(parts)
+        # Underscore → hyphen normalization for slash commands (e.g. /code_review → /code-review)
+        # Only the head is rewritten, split at the match end in the original
+        # text (lowercasing can change length); the rest, including the
+        # first newline of a multi-line prompt, is kept as-is
+        if "_" in cmd_head:
+            text = text[:head_end].replace("_", "-") + text[head_end:]
 
     # Default: send to AI
     handle_message(text)
@@ -345,6 +501,10 @@ def process_update(update):
 # Bot command sync + startup
 # ---------------------------------------------------------------------------
 
+_SKILL_FRONT_MATTER_RE = re.compile(r"^---\r?\n(.*?)\r?\n---", re.DOTALL)
+_SKILL_CACHE_FILE = os.path.join(config.DATA_DIR, "skill_cache.json")
+
+
 def _discover_plugin_skills():
     """Scan installed Claude Code plugins and extract skills from SKILL.md files.
 
@@ -353,26 +513,37 @@ def _discover_plugin_skills():
     Only scans plugins listed in installed_plugins.json (actually installed).
     Marketplace catalog directories are NOT scanned to avoid showing uninstalled plugins.
     """
-    import re as _re
-    claude_dir = os.path.join(os.path.expanduser("~"), ".claude", "plugins")
+    claude_dir = os.path.join(_HOME, ".claude", "plugins")
     if not os.path.isdir(claude_dir):
         return {}
 
     grouped = {}  # {plugin_name: [(cmd, desc), ...]}
     seen = set()
-
-    def _parse_skill_md(skill_md, plugin_name):
-        """Parse a single SKILL.md and append to grouped dict."""
+    # Parsed SKILL.md results from the last scan: {path: [mtime_ns, size, cmd, desc]}
+    try:
+        with open(_SKILL_CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+    except Exception:
+        cache = {}
+    new_cache = {}
+
+    def _parse_skill_md(skill_md):
+        """Parse a single SKILL.md and return (cmd, desc), or None."""
         try:
             with open(skill_md, encoding="utf-8") as f:
-                content = f.read()
+                # Only the leading front matter is used; the body can be large
+                content = f.read(4096)
+                m = _SKILL_FRONT_MATTER_RE.match(content)
+                if not m and content.startswith("---"):
+                    content += f.read()  # unusually long front matter
+                    m = _SKILL_FRONT_MATTER_RE.match(content)
         except Exception:
-            return
-        m = _re.match(r"^---\r?\n(.*?)\r?\n---", content, _re.DOTALL)
+            return None
         if not m:
-            return
+            return None
         name = os.path.basename(os.path.dirname(skill_md))
         desc = ""
+        got_name = False
         for line in m.group(1).split("\n"):
             colon = line.find(":")
             if colon == -1:
@@ -381,62 +552,95 @@ def _discover_plugin_skills():
             val = line[colon + 1:].strip().strip("'\"")
             if key == "name":
                 name = val
+                got_name = True
             elif key == "description":
                 desc = val
-        cmd = name.lower().replace("-", "_")
-        if cmd not in seen and desc:
-            seen.add(cmd)
-            grouped.setdefault(plugin_name, []).append((cmd, desc))
-
-    def _scan_skills_dir(skills_dir, plugin_name):
-        """Scan a skills directory for SKILL.md files."""
-        if not os.path.isdir(skills_dir):
-            return
+            else:
+                continue
+            if got_name and desc:
+                break  # nothing else in the front matter is used
+        return name.lower().replace("-", "_"), desc
+
+    def _scan_skills_dir(skills_dir):
+        """Scan a skills directory for SKILL.md files. Returns [(cmd, desc), ...]."""
+        found = []
+        try:
+            with os.scandir(skills_dir) as it:
+                # d_type from readdir: stray files are skipped without a stat
+                subdirs = [e.path for e in it if e.is_dir()]
+        except OSError:
+            return found  # missing or unreadable
+        for subdir in subdirs:
+            skill_md = os.path.join(subdir, "SKILL.md")
+            try:
+                st = os.stat(skill_md)
+            except OSError:
+                continue
+            sig = [st.st_mtime_ns, st.st_size]
+            hit = cache.get(skill_md)
+            if hit and hit[:2] == sig:
+                parsed = tuple(hit[2:]) if hit[2] else None
+            else:
+                parsed = _parse_skill_md(skill_md)
+            new_cache[skill_md] = sig + (list(parsed) if parsed else [None, None])
+            if parsed:
+                found.append(parsed)
+        return found
+
+    def _resolve_skills_dir(install_path):
+        """Skills directory from the install's plugin.json, else <install>/skills."""
         try:
-            entries = os.listdir(skills_dir)
+            with open(os.path.join(install_path, ".claude-plugin", "plugin.json"),
+                      encoding="utf-8") as f:
+                skills_rel = json.load(f).get("skills", "./skills/")
+            return os.path.normpath(os.path.join(install_path, skills_rel))
         except Exception:
-            return
-        for entry in entries:
-            skill_md = os.path.join(skills_dir, entry, "SKILL.md")
-            if os.path.isfile(skill_md):
-                _parse_skill_md(skill_md, plugin_name)
+            return os.path.join(install_path, "skills")
 
-    # 1. Installed plugins (installPath + plugin.json)
+    # 1. Installed plugins: one (install_path, plugin_name) plan per install
+    plans = []  # in installed_plugins.json order
     plugins_file = os.path.join(claude_dir, "installed_plugins.json")
-    if os.path.isfile(plugins_file):
+    try:
+        with open(plugins_file, encoding="utf-8") as f:
+            data = json.load(f)
+        for plugin_key, installs in data.get("plugins", {}).items():
+            # Prefer marketplace alias (after @) as it's shorter
+            # e.g. "oh-my-claudecode@omc" → "omc"
+            plugin_name = plugin_key.split("@")[1] if "@" in plugin_key else plugin_key
+            for install in installs:
+                install_path = install.get("installPath", "")
+                if install_path and os.path.isdir(install_path):
+                    plans.append((install_path, plugin_name))
+    except Exception:
+        pass  # missing or malformed installed_plugins.json
+
+    # 2. Read plugin.json and scan skill dirs in parallel (I/O-bound), merge
+    #    in original order so the first plugin to claim a command name still wins.
+    if plans:
+        with ThreadPoolExecutor(max_workers=min(8, len(plans))) as ex:
+            results = list(ex.map(
+                lambda p: _scan_skills_dir(_resolve_skills_dir(p[0])), plans))
+        for (_, plugin_name), found in zip(plans, results):
+            for cmd, desc in found:
+                if cmd not in seen and desc:
+                    seen.add(cmd)
+                    grouped.setdefault(plugin_name, []).append((cmd, desc))
+
+    if new_cache != cache:
         try:
-            with open(plugins_file, encoding="utf-8") as f:
-                data = json.load(f)
-            for plugin_key, installs in data.get("plugins", {}).items():
-                # Prefer marketplace alias (after @) as it's shorter
-                # e.g. "oh-my-claudecode@omc" → "omc"
-                if "@" in plugin_key:
-                    plugin_name = plugin_key.split("@")[1]
-                else:
-                    plugin_name = plugin_key
-                for install in installs:
-                    install_path = install.get("installPath", "")
-                    if not install_path or not os.path.isdir(install_path):
-                        continue
-                    plugin_json = os.path.join(install_path, ".claude-plugin", "plugin.json")
-                    skills_dir = os.path.join(install_path, "skills")
-                    if os.path.isfile(plugin_json):
-                        try:
-                            with open(plugin_json, encoding="utf-8") as f:
-                                pdata = json.load(f)
-                            skills_rel = pdata.get("skills", "./skills/")
-                            skills_dir = os.path.normpath(os.path.join(install_path, skills_rel))
-                        except Exception:
-                            pass
-                    _scan_skills_dir(skills_dir, plugin_name)
-        except Exception:
-            pass
+            with open(_SKILL_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(new_cache, f, ensure_ascii=False)
+        except Exception as e:
+            log.warning("Failed to write skill cache: %s", e)
 
     total = sum(len(v) for v in grouped.values())
     log.info("Discovered %d plugin skills across %d plugins", total, len(grouped))
     return grouped
 
 
+_COMMANDS_HASH_FILE = os.path.join(config.DATA_DIR, "bot_commands.sha1")
+
+
 def _sync_bot_commands():
     """Register bot commands with BotFather on startup.
 
@@ -445,10 +649,9 @@ def _sync_bot_commands():
     - Individual plugin skills are NOT registered (shown via inline keyboard instead)
     """
     try:
-        from commands import _handlers
+        from commands import NATIVE_COMMAND_SET as bot_native
 
         # 1. Bot-native commands from i18n (localized descriptions)
-        bot_native = {k.lstrip("/").lower() for k in _handlers}
         bot_commands = i18n.t("bot_commands")
         if not isinstance(bot_commands, list):
             bot_commands = []
@@ -477,8 +680,23 @@ def _sync_bot_commands():
                 merged.append({"command": menu_cmd, "description": desc[:256]})
 
         if merged:
-            result = tg_api("setMyCommands", {"commands": json.dumps(merged)})
+            payload = json.dumps(merged, separators=(",", ":"))
+            # Skip the call when this bot already got this exact list last run
+            digest = hashlib.sha1(f"{BOT_TOKEN}\n{payload}".encode()).hexdigest()
+            try:
+                with open(_COMMANDS_HASH_FILE, encoding="utf-8") as f:
+                    if f.read().strip() == digest:
+                        log.info("BotFather commands unchanged (%d), skipping sync", len(merged))
+                        return
+            except OSError:
+                pass
+            result = tg_api("setMyCommands", {"commands": payload})
             if result and result.get("ok"):
+                try:
+                    with open(_COMMANDS_HASH_FILE, "w", encoding="utf-8") as f:
+                        f.write(digest)
+                except OSError as e:
+                    log.warning("Failed to save commands hash: %s", e)
                 plugin_count = len(plugin_groups)
                 log.info("BotFather commands synced (%d total: %d bot-native + %d plugin menus)",
                          len(merged), len(merged) - plugin_count, plugin_count)
@@ -493,6 +711,10 @@ def _sync_bot_commands():
 # ---------------------------------------------------------------------------
 
 _lock_fd = None
+_ALLOWED_UPDATES = json.dumps(["message", "callback_query"])
+_init_done = threading.Event()  # set once poll_loop startup finishes
+_update_q = queue.Queue()       # messages awaiting _update_worker
+_callback_q = queue.Queue()     # callback queries: separate lane so taps never wait behind a message
 
 
 def _acquire_instance_lock():
@@ -517,77 +739,76 @@ def _acquire_instance_lock():
         sys.exit(0)
 
 
+# main.py, telegram-bot.py, telegram-bot-ko.py, telegram-bot-en.py
+_BOT_SCRIPT_RE = re.compile(r"(?:main|telegram-bot(?:-ko|-en)?)\.py")
+
+
+def _iter_python_processes():
+    """Yield (pid, cmdline) for running Python processes (Windows only).
+
+    POSIX never gets here: _acquire_instance_lock's flock keeps a single
+    instance there, so only Windows calls _kill_duplicate_bots().
+    psutil is used when installed, otherwise PowerShell.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil:
+        # In-process enumeration: no PowerShell start-up on every boot
+        for p in psutil.process_iter(["pid", "name", "cmdline"]):
+            if "python" in (p.info["name"] or "").lower():
+                yield p.info["pid"], " ".join(p.info["cmdline"] or ())
+        return
+
+    import subprocess as _sp
+    # Use PowerShell (wmic is removed in newer Windows)
+    ps_cmd = (
+        "Get-CimInstance Win32_Process -Filter \"Name like '%python%'\" "
+        "| Select-Object ProcessId, CommandLine "
+        "| ForEach-Object { \"$($_.ProcessId)|$($_.CommandLine)\" }"
+    )
+    out = _sp.check_output(
+        ["powershell", "-NoProfile", "-Command", ps_cmd],
+        creationflags=_sp.CREATE_NO_WINDOW,
+        timeout=10,
+    ).decode("utf-8", errors="replace")
+    for line in out.strip().splitlines():
+        line = line.strip()
+        if "|" not in line:
+            continue
+        pid_str, cmdline = line.split("|", 1)
+        try:
+            yield int(pid_str.strip()), cmdline
+        except ValueError:
+            continue
+
+
 def _kill_duplicate_bots():
     """Find and kill other bot processes (same script), return count killed."""
-    import subprocess as _sp
     my_pid = os.getpid()
     skip_pids = {my_pid}
     try:
         skip_pids.add(os.getppid())
     except (AttributeError, OSError):
         pass
-    killed = 0
-    bot_scripts = {"main.py", "telegram-bot-ko.py", "telegram-bot-en.py", "telegram-bot.py"}
+    killed = []
     try:
-        if IS_WINDOWS:
-            # Use PowerShell (wmic is removed in newer Windows)
-            ps_cmd = (
-                "Get-CimInstance Win32_Process -Filter \"Name like '%python%'\" "
-                "| Select-Object ProcessId, CommandLine "
-                "| ForEach-Object { \"$($_.ProcessId)|$($_.CommandLine)\" }"
-            )
-            out = _sp.check_output(
-                ["powershell", "-NoProfile", "-Command", ps_cmd],
-                creationflags=_sp.CREATE_NO_WINDOW,
-                timeout=10,
-            ).decode("utf-8", errors="replace")
-            for line in out.strip().splitlines():
-                line = line.strip()
-                if "|" not in line:
-                    continue
-                pid_str, cmdline = line.split("|", 1)
-                try:
-                    pid = int(pid_str.strip())
-                except ValueError:
-                    continue
-                if pid in skip_pids:
-                    continue
-                if any(s in cmdline for s in bot_scripts):
-                    try:
-                        os.kill(pid, signal.SIGTERM)
-                        killed += 1
-                        log.info("Killed duplicate bot process: PID %d", pid)
-                    except OSError:
-                        pass
-        else:
-            out = _sp.check_output(
-                ["ps", "-eo", "pid,args"],
-                timeout=10,
-            ).decode("utf-8", errors="replace")
-            for line in out.strip().splitlines()[1:]:
-                line = line.strip()
-                if not line:
-                    continue
-                tok = line.split(None, 1)
-                if len(tok) < 2:
-                    continue
-                try:
-                    pid = int(tok[0])
-                except ValueError:
-                    continue
-                cmdline = tok[1]
-                if pid in skip_pids:
-                    continue
-                if "python" in cmdline.lower() and any(s in cmdline for s in bot_scripts):
-                    try:
-                        os.kill(pid, signal.SIGTERM)
-                        killed += 1
-                        log.info("Killed duplicate bot process: PID %d", pid)
-                    except OSError:
-                        pass
+        # Match first, then signal back to back so duplicates stop competing
+        # for getUpdates as early as possible; log once afterwards
+        pids = [pid for pid, cmdline in _iter_python_processes()
+                if pid not in skip_pids and _BOT_SCRIPT_RE.search(cmdline)]
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                killed.append(pid)
+            except OSError:
+                pass
     except Exception as e:
         log.warning("Duplicate bot check failed: %s", e)
-    return killed
+    if killed:
+        log.info("Killed duplicate bot processes: %s", killed)
+    return len(killed)
 
 
 def _start_file_viewer():
@@ -626,6 +847,32 @@ def _stop_file_viewer():
         state._file_server = None
 
 
+def _update_worker(q):
+    """Process updates from q in arrival order, off the long-polling thread."""
+    while True:
+        upd = q.get()
+        try:
+            process_update(upd)
+        except Exception as e:
+            log.error("Update error: %s", e, exc_info=True)
+
+
+def _send_startup_banner(killed):
+    """Announce startup (and any duplicate processes that were killed)."""
+    _prov = state.provider_label
+    _mdl = state.model or "default"
+    msg = f"<b>{i18n.t('bot_started', provider=_prov, model=_mdl)}</b>"
+    if killed > 0:
+        msg = f"<b>{i18n.t('bot_duplicate', count=killed)}</b>\n{msg}"
+    send_html(msg)  # one sendMessage for both notices
+
+
+def _poll_backoff(failures):
+    """Seconds to wait after N consecutive poll failures: 1s doubling to a
+    60s cap, jittered so restarted peers don't retry in lockstep."""
+    return random.uniform(0.5, 1.0) * min(60, 2 ** (failures - 1))
+
+
 def poll_loop():
     offset = 0
     log.info("Bot started.")
@@ -640,15 +887,30 @@ def poll_loop():
 
     # Token data publishing thread
     def _token_publish_loop():
-        time.sleep(10)
+        # Publish as soon as startup state is ready (at most 10s in), then at
+        # most once per interval and only when something may have changed:
+        # new token_log entries, a date rollover (period totals reset), or an
+        # hourly refresh for usage made outside the bot (CLI JSONL fallback).
+        _init_done.wait(timeout=10)
+        last_day = None
+        last_publish = 0
         while True:
-            try:
-                publish_token_data()
-            except Exception as e:
-                log.error("Token publish error: %s", e)
+            today = time.strftime("%Y-%m-%d")
+            if (state.tokens_dirty.is_set() or today != last_day
+                    or time.time() - last_publish >= 3600):
+                state.tokens_dirty.clear()
+                try:
+                    publish_token_data()
+                except Exception as e:
+                    log.error("Token publish error: %s", e)
+                last_day = today
+                last_publish = time.time()
             time.sleep(PUBLISH_INTERVAL)
 
     threading.Thread(target=_token_publish_loop, daemon=True).start()
+    threading.Thread(target=_typing_worker, daemon=True).start()
+    threading.Thread(target=_stream_worker, daemon=True).start()
+    threading.Thread(target=_run_worker, daemon=True).start()
     log.info("Token publish thread started (interval: %ds)", PUBLISH_INTERVAL)
 
     # CLI direct-response watcher (forwards external CLI output to Telegram)
@@ -657,34 +919,37 @@ def poll_loop():
     state.global_tokens = get_monthly_tokens()
     log.info("Monthly tokens loaded: %d", state.global_tokens)
 
-    if killed > 0:
-        send_html(f"<b>{i18n.t('bot_duplicate', count=killed)}</b>")
-    _prov = config.AI_MODELS.get(state.provider, {}).get("label", state.provider.title())
-    _mdl = state.model or "default"
-    send_html(f"<b>{i18n.t('bot_started', provider=_prov, model=_mdl)}</b>")
+    # The banner needs no reply; don't hold the first getUpdates on its RTT
+    threading.Thread(target=_send_startup_banner, args=(killed,), daemon=True).start()
 
+    _init_done.set()
+    # Two ordered lanes: messages stay strictly sequential, while keyboard
+    # taps aren't held behind a slow download or command in the message lane
+    threading.Thread(target=_update_worker, args=(_update_q,), daemon=True).start()
+    threading.Thread(target=_update_worker, args=(_callback_q,), daemon=True).start()
+
+    params = {"offset": offset, "timeout": POLL_TIMEOUT, "allowed_updates": _ALLOWED_UPDATES}
+    failures = 0
     while True:
         try:
-            result = tg_api("getUpdates", {
-                "offset": offset,
-                "timeout": POLL_TIMEOUT,
-                "allowed_updates": json.dumps(["message", "callback_query"]),
-            })
+            params["offset"] = offset
+            result = tg_api("getUpdates", params)
             if not result or not result.get("ok"):
-                log.warning("getUpdates failed")
-                time.sleep(5)
+                failures += 1
+                log.warning("getUpdates failed (%d in a row)", failures)
+                time.sleep(_poll_backoff(failures))
                 continue
+            failures = 0
+            # Hand off and re-poll immediately; slow handlers never delay getUpdates
             for upd in result.get("result", []):
                 offset = upd["update_id"] + 1
-                try:
-                    process_update(upd)
-                except Exception as e:
-                    log.error("Update error: %s", e, exc_info=True)
+                (_callback_q if "callback_query" in upd else _update_q).put(upd)
         except KeyboardInterrupt:
             break
         except Exception as e:
+            failures += 1
             log.error("Poll error: %s", e, exc_info=True)
-            time.sleep(5)
+            time.sleep(_poll_backoff(failures))
 
 
 # ---------------------------------------------------------------------------
@@ -693,7 +958,7 @@ def poll_loop():
 
 def _bootstrap_files():
     """One-time full sync if local update.py lacks the new all-files updater."""
-    bot_dir = os.path.dirname(os.path.abspath(__file__))
+    bot_dir = config.BOT_DIR
     update_path = os.path.join(bot_dir, "commands", "system", "update.py")
     marker = "_fetch_bot_file_list"
     try:
@@ -703,45 +968,41 @@ def _bootstrap_files():
     except FileNotFoundError:
         pass  # file missing, need bootstrap
 
-    import base64
-    import hashlib
+    import tarfile
     import urllib.request
     github_repo = config._config.get("github_repo", "xmin-02/sumone")
     log.info("Bootstrap: syncing all bot files from GitHub...")
     try:
-        api_url = f"https://api.github.com/repos/{github_repo}/git/trees/main?recursive=1"
-        req = urllib.request.Request(api_url, headers={"Accept": "application/vnd.github.v3+json"})
-        resp = urllib.request.urlopen(req, timeout=15)
-        tree = json.loads(resp.read().decode())
+        # One streamed tarball of the branch instead of a tree call plus one
+        # API request per changed blob (and no API rate-limit exposure)
+        url = f"https://codeload.github.com/{github_repo}/tar.gz/main"
+        resp = urllib.request.urlopen(url, timeout=30)
         count = 0
-        for item in tree.get("tree", []):
-            if item["type"] != "blob" or not item["path"].startswith("bot/"):
-                continue
-            rel_path = item["path"][4:]
-            local_path = os.path.join(bot_dir, rel_path)
-            # Compare git blob SHA — skip if unchanged
-            if os.path.exists(local_path):
+        with tarfile.open(fileobj=resp, mode="r|gz") as tar:
+            for member in tar:
+                parts = member.name.split("/", 2)  # "<repo>-main/bot/<rel>"
+                if not member.isfile() or len(parts) < 3 or parts[1] != "bot":
+                    continue
+                rel_parts = parts[2].split("/")
+                if ".." in rel_parts:
+                    continue
+                local_path = os.path.join(bot_dir, *rel_parts)
+                content = tar.extractfile(member).read()
+                # Skip unchanged files: sizes must match before comparing bytes
                 try:
-                    with open(local_path, "rb") as f:
-                        data = f.read()
-                    local_sha = hashlib.sha1(f"blob {len(data)}\0".encode() + data).hexdigest()
-                    if local_sha == item["sha"]:
-                        continue
-                except Exception:
-                    pass
-            # Download via Contents API (no CDN cache)
-            try:
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                contents_url = f"https://api.github.com/repos/{github_repo}/contents/bot/{rel_path}?ref=main"
-                creq = urllib.request.Request(contents_url, headers={"Accept": "application/vnd.github.v3+json"})
-                cresp = urllib.request.urlopen(creq, timeout=15)
-                cdata = json.loads(cresp.read().decode())
-                content = base64.b64decode(cdata["content"])
-                with open(local_path, "wb") as f:
-                    f.write(content)
-                count += 1
-            except Exception:
-                pass
+                    if os.path.getsize(local_path) == len(content):
+                        with open(local_path, "rb") as f:
+                            if f.read() == content:
+                                continue
+                except OSError:
+                    pass  # missing locally
+                try:
+                    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                    with open(local_path, "wb") as f:
+                        f.write(content)
+                    count += 1
+                except OSError as e:
+                    log.warning("Bootstrap: failed to write %s: %s", parts[2], e)
         log.info("Bootstrap complete: %d files updated", count)
         if count > 0:
             log.info("Restarting after bootstrap...")
@@ -756,49 +1017,53 @@ def _detect_cli_status():
     import shutil as _sh
     from state import get_provider_env
     # Ensure common CLI paths are in PATH (exec may strip them)
-    _extra = [os.path.expanduser("~/.local/bin"), os.path.expanduser("~/.npm-global/bin"),
+    _extra = [os.path.join(_HOME, ".local", "bin"), os.path.join(_HOME, ".npm-global", "bin"),
               "/opt/homebrew/bin", "/opt/homebrew/sbin", "/usr/local/bin"]
     _cur_path = os.environ.get("PATH", "")
     _missing = [p for p in _extra if p not in _cur_path]
     if _missing:
         os.environ["PATH"] = ":".join(_missing) + ":" + _cur_path
-    # Auth check commands per provider (exit code 0 = authenticated)
-    for provider, info in config.AI_MODELS.items():
+
+    def _check_provider(provider, info):
+        """Return True if the provider CLI is installed, runnable and authenticated."""
         cmd = info.get("cli_cmd", provider)
         resolved = _sh.which(cmd)
         if not resolved:
-            state.cli_status[provider] = False
-            continue
+            return False
         # Gemini CLI .CMD wrapper hangs in subprocess on Windows,
         # so skip --version check and use auth-file detection only.
         if provider == "gemini":
-            gdir = os.path.expanduser("~/.gemini")
-            state.cli_status[provider] = (
+            gdir = os.path.join(_HOME, ".gemini")
+            return (
                 os.path.isfile(os.path.join(gdir, "oauth_creds.json"))
                 or os.path.isfile(os.path.join(gdir, "google_accounts.json"))
             )
-            continue
         try:
             r = _sp.run([resolved, "--version"], capture_output=True, timeout=5)
             if r.returncode != 0:
-                state.cli_status[provider] = False
-                continue
+                return False
         except Exception:
-            state.cli_status[provider] = False
-            continue
-        # Check auth status (same logic as connect.py _check_auth)
+            return False
+        # Check auth status (same logic as connect.py _check_auth; exit 0 = authenticated)
         env = {**os.environ, **get_provider_env(provider)}
         try:
             if provider == "codex":
-                state.cli_status[provider] = _sp.run(
+                return _sp.run(
                     [resolved, "login", "status"], capture_output=True, timeout=5, env=env
                 ).returncode == 0
             else:  # claude
-                state.cli_status[provider] = _sp.run(
+                return _sp.run(
                     [resolved, "auth", "status"], capture_output=True, timeout=5, env=env
                 ).returncode == 0
         except Exception:
-            state.cli_status[provider] = False
+            return False
+
+    # Providers are independent subprocess waits — check them concurrently
+    providers = list(config.AI_MODELS.items())
+    with ThreadPoolExecutor(max_workers=max(1, len(providers))) as ex:
+        futures = {p: ex.submit(_check_provider, p, info) for p, info in providers}
+    for provider, fut in futures.items():
+        state.cli_status[provider] = fut.result()
     log.info("CLI status: %s", state.cli_status)
 
 
@@ -819,34 +1084,32 @@ def _apply_default_model():
         if actual_prov != state.provider:
             state.session_id = None
     switch_provider(ai)
+    ai_info = config.AI_MODELS.get(ai) or {}
+    subs = ai_info.get("sub_models", {})
     # Restore the persisted model for the active provider first.
     saved_model = state._provider_models.get(ai)
     if not saved_model:
         legacy_model = config._config.get("model")
-        if legacy_model:
-            ai_info = config.AI_MODELS.get(ai, {})
-            if legacy_model in ai_info.get("sub_models", {}).values():
-                saved_model = legacy_model
+        if legacy_model and legacy_model in subs.values():
+            saved_model = legacy_model
     if saved_model:
         state.model = saved_model
         config.log.info("Restored model: %s (%s)", saved_model, ai)
     else:
-        ai_info = config.AI_MODELS.get(ai)
-        if ai_info:
-            resolved = None
-            subs = ai_info.get("sub_models", {})
-            if sub:
-                resolved = subs.get(sub)
-            if not resolved:
-                default_sub = ai_info.get("default")
-                if default_sub:
-                    resolved = subs.get(default_sub)
-            if resolved:
-                state.model = resolved
-                config.log.info("Default model applied: %s (%s)", resolved, ai)
+        resolved = subs.get(sub) if sub else None
+        if not resolved:
+            default_sub = ai_info.get("default")
+            if default_sub:
+                resolved = subs.get(default_sub)
+        if resolved:
+            state.model = resolved
+            config.log.info("Default model applied: %s (%s)", resolved, ai)
     config.update_config("model", state.model)
 
 
+_MIGRATION_MARKER = os.path.join(config.ROOT_DIR, ".migration_done_v1")
+
+
 def _migrate_old_layout():
     """Migrate data and code from old location to DDD layout.
 
@@ -857,7 +1120,7 @@ def _migrate_old_layout():
     4. Re-exec from ~/.sumone/bot/main.py
     """
     import shutil
-    old_bot = os.path.expanduser("~/.claude-telegram-bot")
+    old_bot = os.path.join(_HOME, ".claude-telegram-bot")
     root = config.ROOT_DIR            # ~/.sumone
     data_dir = config.DATA_DIR        # ~/.sumone/data
     bin_dir = config.BIN_DIR          # ~/.sumone/bin
@@ -865,20 +1128,39 @@ def _migrate_old_layout():
     new_bot_dir = os.path.join(root, "bot")   # ~/.sumone/bot
 
     # Detect if running from old location (not under ~/.sumone/)
-    cur_bot = os.path.abspath(config.BOT_DIR)
-    running_from_old = not cur_bot.startswith(os.path.abspath(root) + os.sep)
+    cur_bot = config.BOT_DIR
+    running_from_old = not cur_bot.startswith(root + os.sep)
+
+    # Once a run from ~/.sumone/bot has migrated everything, later startups
+    # skip the per-path probes below; a run from the old dir still migrates
+    if not running_from_old and os.path.lexists(_MIGRATION_MARKER):
+        return
 
     migrated = []
 
+    def _move(src, dst):
+        """Rename in place; copy+delete only if dst is on another filesystem."""
+        try:
+            os.replace(src, dst)
+        except OSError:
+            shutil.move(src, dst)
+
+    def _move_files(src_dir, dst_dir):
+        """Move regular files from src_dir into dst_dir, keeping existing ones."""
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                # DirEntry type comes from readdir; no stat for the source
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                dst = os.path.join(dst_dir, entry.name)
+                if not os.path.lexists(dst):
+                    _move(entry.path, dst)
+
     # --- Data: ~/.sumone/sessions/ → ~/.sumone/data/sessions/ ---
     old_sessions = os.path.join(root, "sessions")
     new_sessions = os.path.join(data_dir, "sessions")
     if os.path.isdir(old_sessions) and old_sessions != new_sessions:
-        for fname in os.listdir(old_sessions):
-            src = os.path.join(old_sessions, fname)
-            dst = os.path.join(new_sessions, fname)
-            if os.path.isfile(src) and not os.path.isfile(dst):
-                shutil.move(src, dst)
+        _move_files(old_sessions, new_sessions)
         try:
             os.rmdir(old_sessions)
             migrated.append("sessions/")
@@ -889,7 +1171,7 @@ def _migrate_old_layout():
     old_tlog = os.path.join(root, "token_log.jsonl")
     new_tlog = os.path.join(data_dir, "token_log.jsonl")
     if os.path.isfile(old_tlog) and not os.path.isfile(new_tlog):
-        shutil.move(old_tlog, new_tlog)
+        _move(old_tlog, new_tlog)
         migrated.append("token_log.jsonl")
 
     # --- Data from old bot dir ---
@@ -898,22 +1180,14 @@ def _migrate_old_layout():
         old_dl = os.path.join(old_bot, "downloads")
         new_dl = os.path.join(data_dir, "downloads")
         if os.path.isdir(old_dl):
-            for fname in os.listdir(old_dl):
-                src = os.path.join(old_dl, fname)
-                dst = os.path.join(new_dl, fname)
-                if os.path.isfile(src) and not os.path.isfile(dst):
-                    shutil.move(src, dst)
+            _move_files(old_dl, new_dl)
             migrated.append("downloads/")
 
         # .snapshots/ → data/snapshots/
         old_snap = os.path.join(old_bot, ".snapshots")
         new_snap = os.path.join(data_dir, "snapshots")
         if os.path.isdir(old_snap):
-            for fname in os.listdir(old_snap):
-                src = os.path.join(old_snap, fname)
-                dst = os.path.join(new_snap, fname)
-                if os.path.isfile(src) and not os.path.isfile(dst):
-                    shutil.move(src, dst)
+            _move_files(old_snap, new_snap)
             migrated.append("snapshots/")
 
         # modified_files.json
@@ -950,30 +1224,45 @@ def _migrate_old_layout():
             "settings.py", "update.py", "total_tokens.py", "skills.py",
         }
         os.makedirs(new_bot_dir, exist_ok=True)
-        for dirpath, dirnames, filenames in os.walk(cur_bot):
-            # Skip __pycache__
-            dirnames[:] = [d for d in dirnames if d != "__pycache__"]
-            rel = os.path.relpath(dirpath, cur_bot)
+        # Old single-file claude.py at bot root is skipped once ai/ replaces it
+        skip_claude_py = os.path.isdir(os.path.join(cur_bot, "ai"))
+        stack = [(cur_bot, ".")]  # (source dir, path relative to cur_bot)
+        copies = []  # (src, dst); directories are created during the walk
+        while stack:
+            src_dir, rel = stack.pop()
             dst_dir = os.path.join(new_bot_dir, rel) if rel != "." else new_bot_dir
             os.makedirs(dst_dir, exist_ok=True)
-            for fname in filenames:
-                if not fname.endswith((".py", ".json")):
-                    continue
-                # Skip orphan command files at commands/ root
-                if rel == "commands" and fname in _orphans:
-                    continue
-                # Skip old single-file claude.py at bot root (replaced by ai/)
-                if rel == "." and fname == "claude.py" and os.path.isdir(
-                        os.path.join(cur_bot, "ai")):
-                    continue
-                src = os.path.join(dirpath, fname)
-                dst = os.path.join(dst_dir, fname)
-                shutil.copy2(src, dst)
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    fname = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if fname != "__pycache__":
+                            stack.append((entry.path,
+                                          fname if rel == "." else os.path.join(rel, fname)))
+                        continue
+                    if not fname.endswith((".py", ".json")):
+                        continue
+                    # Skip orphan command files at commands/ root
+                    if rel == "commands" and fname in _orphans:
+                        continue
+                    if rel == "." and fname == "claude.py" and skip_claude_py:
+                        continue
+                    copies.append((entry.path, os.path.join(dst_dir, fname)))
+        # Many small files: overlap their open/copy latency across threads
+        if copies:
+            with ThreadPoolExecutor(max_workers=min(8, len(copies))) as ex:
+                list(ex.map(lambda c: shutil.copy2(*c), copies))
         migrated.append("bot code → ~/.sumone/bot/")
         config.log.info("Bot code copied to %s", new_bot_dir)
 
     if migrated:
         config.log.info("Migration complete: %s", ", ".join(migrated))
+    if not running_from_old:
+        try:
+            with open(_MIGRATION_MARKER, "w", encoding="utf-8") as f:
+                f.write("1\n")
+        except OSError as e:
+            config.log.warning("Failed to write migration marker: %s", e)
 
     # --- Re-exec from new location ---
     if running_from_old:
@@ -997,16 +1286,17 @@ def _update_launchd_plist(target_bot_dir):
 
     bot_main = os.path.join(target_bot_dir, "main.py")
     log_dir = config.LOG_DIR
-    plist_dir = os.path.expanduser("~/Library/LaunchAgents")
+    plist_dir = os.path.join(_HOME, "Library", "LaunchAgents")
 
     # Find and update any existing plist
     for name in ["com.claude.telegram-bot.plist", "com.sumone.telegram-bot.plist"]:
         plist_path = os.path.join(plist_dir, name)
-        if not os.path.isfile(plist_path):
-            continue
         try:
             with open(plist_path, encoding="utf-8") as f:
                 content = f.read()
+        except OSError:
+            continue  # not installed under this name
+        try:
             if bot_main in content and log_dir in content:
                 continue  # already up to date
             # Rewrite plist with correct paths
@@ -1055,7 +1345,7 @@ def _update_windows_task(target_bot_dir):
         try:
             result = _sp.run(
                 ["schtasks", "/Query", "/TN", task_name],
-                capture_output=True, text=True, timeout=10,
+                stdin=_sp.DEVNULL, capture_output=True, text=True, timeout=10,
                 creationflags=_sp.CREATE_NO_WINDOW,
             )
             if result.returncode != 0:
@@ -1064,7 +1354,7 @@ def _update_windows_task(target_bot_dir):
             _sp.run(
                 ["schtasks", "/Change", "/TN", task_name,
                  "/TR", f'"{python_path}" "{bot_main}"'],
-                capture_output=True, text=True, timeout=10,
+                stdin=_sp.DEVNULL, capture_output=True, text=True, timeout=10,
                 creationflags=_sp.CREATE_NO_WINDOW,
             )
             config.log.info("Windows Task Scheduler updated: %s", task_name)
@@ -1083,12 +1373,13 @@ def _update_systemd_service(target_bot_dir):
     if platform.system() != "Linux":
         return
     bot_main = os.path.join(target_bot_dir, "main.py")
-    svc_path = os.path.expanduser("~/.config/systemd/user/claude-telegram.service")
-    if not os.path.isfile(svc_path):
-        return
+    svc_path = os.path.join(_HOME, ".config", "systemd", "user", "claude-telegram.service")
     try:
         with open(svc_path, encoding="utf-8") as f:
             content = f.read()
+    except OSError:
+        return  # no user service installed
+    try:
         if bot_main in content:
             return  # already up to date
         python_path = sys.executable
@@ -1099,7 +1390,7 @@ def _update_systemd_service(target_bot_dir):
             f"ExecStart={python_path} {bot_main}\n"
             "Restart=always\n"
             "RestartSec=5\n"
-            f"Environment=HOME={os.path.expanduser('~')}\n\n"
+            f"Environment=HOME={_HOME}\n\n"
             "[Install]\n"
             "WantedBy=default.target\n"
         )
@@ -156,39 +156,64 @@ AI_PROVIDERS = {
 }
 
 
+# {(lang, key): text} — one lookup per string; English fills any gaps
+_FLAT_I18N = {(lang, key): text
+              for lang, strings in _ONBOARD_I18N.items()
+              for key, text in strings.items()}
+_EN_I18N = _ONBOARD_I18N["en"]
+
+
 def _t(lang, key):
-    return _ONBOARD_I18N.get(lang, _ONBOARD_I18N["en"]).get(key, key)
+    text = _FLAT_I18N.get((lang, key))
+    return text if text is not None else _EN_I18N.get(key, key)
 
 
 # ---------------------------------------------------------------------------
 # Cross-platform key input
 # ---------------------------------------------------------------------------
+_UNIX_KEYS = {'\r': 'ENTER', '\n': 'ENTER', ' ': 'SPACE'}
+_UNIX_ARROWS = {'A': 'UP', 'B': 'DOWN'}
+_unix_pending = ""  # input already read but not yet returned as keys
+
+
+def _split_key(buf):
+    """Split the first key off buf. Returns (key, rest)."""
+    ch = buf[0]
+    if ch != '\x1b':
+        return _UNIX_KEYS.get(ch, ch), buf[1:]
+    if buf[1:2] == 'O' and len(buf) >= 3:      # ESC O A (application mode)
+        return _UNIX_ARROWS.get(buf[2], 'ESC'), buf[3:]
+    if buf[1:2] == '[':                         # CSI: params end at a final byte
+        for j in range(2, len(buf)):
+            if '@' <= buf[j] <= '~':
+                return _UNIX_ARROWS.get(buf[j], 'ESC'), buf[j + 1:]
+    return 'ESC', buf[1:]
+
+
 def _getch_unix():
-    import tty
-    import termios
-    fd = sys.stdin.fileno()
-    old = termios.tcgetattr(fd)
-    try:
-        tty.setraw(fd)
-        ch = sys.stdin.read(1)
-        if ch == '\x1b':
-            ch2 = sys.stdin.read(1)
-            if ch2 == '[':
-                ch3 = sys.stdin.read(1)
-                if ch3 == 'A':
-                    return 'UP'
-                elif ch3 == 'B':
-                    return 'DOWN'
-            return 'ESC'
-        elif ch in ('\r', '\n'):
-            return 'ENTER'
-        elif ch == ' ':
-            return 'SPACE'
-        elif ch == '\x03':
-            raise KeyboardInterrupt
-        return ch
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+    global _unix_pending
+    if not _unix_pending:
+        import select
+        import tty
+        import termios
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            # One read usually holds a whole key, or several under auto-repeat
+            data = os.read(fd, 64)
+            # A lone ESC may be the start of a sequence still in flight
+            while data.endswith(b'\x1b') and select.select([fd], [], [], 0.05)[0]:
+                data += os.read(fd, 64)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+        _unix_pending = data.decode(errors="replace")
+        if not _unix_pending:
+            return None  # stdin closed
+    key, _unix_pending = _split_key(_unix_pending)
+    if key == '\x03':
+        raise KeyboardInterrupt
+    return key
 
 
 def _getch_windows():
@@ -219,19 +244,46 @@ def _getch():
 # ---------------------------------------------------------------------------
 # TUI rendering
 # ---------------------------------------------------------------------------
+_ansi_ok = None  # whether the console understands ANSI escapes; set on first clear
+
+
+def _enable_ansi():
+    """True if ANSI escapes work, turning on VT processing on Windows 10+."""
+    if not IS_WINDOWS:
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
+
 def _clear_screen():
-    os.system('cls' if IS_WINDOWS else 'clear')
+    # An escape sequence instead of spawning clear/cls on every redraw
+    global _ansi_ok
+    if _ansi_ok is None:
+        _ansi_ok = _enable_ansi()
+    if _ansi_ok:
+        sys.stdout.write("\x1b[H\x1b[2J")
+        sys.stdout.flush()
+    else:
+        os.system('cls' if IS_WINDOWS else 'clear')
 
 
-def _header():
-    return (f"\n  ╔{'═' * 50}╗\n"
-            f"  ║  {'sumone — Omni AI Orchestration':^46}  ║\n"
-            f"  ╚{'═' * 50}╝\n")
+_HEADER = (f"\n  ╔{'═' * 50}╗\n"
+           f"  ║  {'sumone — Omni AI Orchestration':^46}  ║\n"
+           f"  ╚{'═' * 50}╝\n")
 
 
 def _render_menu(lang, step_num, total_steps, title, desc, options, selected):
     _clear_screen()
-    print(_header())
+    print(_HEADER)
     print(f"  {_t(lang, 'step')} {step_num}/{total_steps}: {title}")
     print(f"  {desc}\n")
 
@@ -247,7 +299,7 @@ def _render_menu(lang, step_num, total_steps, title, desc, options, selected):
 def _render_multi_menu(lang, step_num, total_steps, title, desc,
                        options, cursor, checked, warn=False):
     _clear_screen()
-    print(_header())
+    print(_HEADER)
     print(f"  {_t(lang, 'step')} {step_num}/{total_steps}: {title}")
     print(f"  {desc}\n")
 
@@ -271,7 +323,7 @@ def _text_input(lang, step_num, total_steps, title, desc, hint="",
     """Text input with TUI header. Loops until validate() returns truthy."""
     while True:
         _clear_screen()
-        print(_header())
+        print(_HEADER)
         print(f"  {_t(lang, 'step')} {step_num}/{total_steps}: {title}")
         print(f"  {desc}\n")
         if hint:
@@ -558,7 +610,7 @@ def _setup_providers(selected_keys, lang):
     Returns the list of provider keys that are ready (CLI installed).
     """
     _clear_screen()
-    print(_header())
+    print(_HEADER)
     print(f"  {_t(lang, 'ai_setup')}\n")
 
     _ensure_path()
@@ -629,7 +681,7 @@ def run_onboarding(lang=None):
     detected_id = _detect_chat_id(bot_token)
     if detected_id:
         _clear_screen()
-        print(_header())
+        print(_HEADER)
         print(f"  {_t(lang, 'step')} {step}/{total}: {_t(lang, 'chat_id')}")
         print(f"  {_t(lang, 'chat_id_desc')}\n")
         print(f"  {_t(lang, 'chat_id_auto').format(chat_id=detected_id)}")
@@ -705,7 +757,7 @@ def run_onboarding(lang=None):
 
     # --- Done ---
     _clear_screen()
-    print(_header())
+    print(_HEADER)
     print(f"  ✓ {_t(lang, 'done')}\n")
     print(f"  {_t(lang, 'done_desc')}\n")
     for k, v in results.items():
@@ -739,8 +791,12 @@ def apply_onboarding(results):
     settings.update(settings_data)
     cfg["settings"] = settings
 
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(cfg, f, indent=4, ensure_ascii=False)
+    # Write beside the target and swap it in, so an interrupted wizard never
+    # leaves a truncated config.json (which holds the bot token) behind
+    tmp = CONFIG_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(cfg, indent=4, ensure_ascii=False))
+    os.replace(tmp, CONFIG_FILE)
 
     print(f"  Config saved: {CONFIG_FILE}\n")
 
@@ -6,7 +6,7 @@ import os
 import threading
 import time
 from datetime import datetime
-from config import _config, DATA_DIR, log
+from config import _config, AI_MODELS, DATA_DIR, log
 
 _MODIFIED_FILES_PATH = os.path.join(DATA_DIR, "modified_files.json")
 _SNAPSHOTS_DIR = os.path.join(DATA_DIR, "snapshots")
@@ -181,6 +181,7 @@ def add_modified_file(path, content=None, op="write"):
     entry = {"path": path, "ts": ts, "snapshot": snapshot_name, "op": op,
              "run_id": _current_run_id, "run_label": _current_run_label}
     state.modified_files.append(entry)
+    state._modified_paths.add(path)
     save_modified_files(state.modified_files)
     return entry
 
@@ -197,6 +198,7 @@ def clear_modified_files():
     """Clear all modified files and snapshots."""
     import shutil
     state.modified_files.clear()
+    state._modified_paths.clear()
     save_modified_files(state.modified_files)
     if os.path.isdir(_SNAPSHOTS_DIR):
         shutil.rmtree(_SNAPSHOTS_DIR, ignore_errors=True)
@@ -221,15 +223,26 @@ class State:
     total_cost = _load_float("total_cost", 0.0)
     last_cost = _load_float("last_cost", 0.0)
     global_tokens = _load_int("monthly_tokens", 0)
+    tokens_dirty = threading.Event()   # set when token_log grows; drives publishing
     waiting_token_input = False
     message_queue = collections.deque()
     lock = threading.Lock()
     # File viewer
     modified_files = _load_modified_files()
+    _modified_paths = {e.get("path") for e in modified_files if isinstance(e, dict)}
     file_viewer_url = None       # cloudflared tunnel public URL
     _file_server = None          # FileViewerServer instance
     _tunnel_proc = None          # cloudflared subprocess
     _viewer_msg_ids = []         # sent viewer link message IDs (for deletion)
+    _label_for = None            # provider that _label was computed for
+
+    @property
+    def provider_label(self):
+        """Display name of the current provider, recomputed only after a switch."""
+        if self._label_for != self.provider:
+            self._label = AI_MODELS.get(self.provider, {}).get("label", self.provider.title())
+            self._label_for = self.provider
+        return self._label
 
 state = State()
 
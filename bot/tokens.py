@@ -14,6 +14,7 @@ from state import state
 from telegram import tg_api_raw
 
 _token_cache = {}
+_remote_cache = {}  # {bot_token: (data, fetched_at)} — peers publish every PUBLISH_INTERVAL
 _TOKEN_LOG = os.path.join(DATA_DIR, "token_log.jsonl")
 
 PUBLISH_LANG = "zu"
@@ -191,7 +192,7 @@ def token_footer():
         period_key = {"day": "d", "month": "m", "year": "y", "total": "t"}.get(period)
         if period_key:
             for bot in REMOTE_BOTS:
-                remote = fetch_remote_tokens(bot.get("token", ""))
+                remote = _cached_remote_tokens(bot.get("token", ""))
                 if remote:
                     count += remote.get(period_key, 0)
     return f"{labels[period]} tokens: {count:,}"
@@ -361,6 +362,16 @@ def fetch_remote_tokens(bot_token):
         return None
 
 
+def _cached_remote_tokens(bot_token):
+    """fetch_remote_tokens() with a 60s cache, for the per-reply footer."""
+    cached = _remote_cache.get(bot_token)
+    if cached and time.time() - cached[1] < 60:
+        return cached[0]
+    data = fetch_remote_tokens(bot_token)
+    _remote_cache[bot_token] = (data, time.time())
+    return data
+
+
 def get_remote_bot_info(bot_token):
     result = tg_api_raw(bot_token, "getMe")
     if not result or not result.get("ok"):